@@ -2,10 +2,26 @@
 #
 import os
 import sys
-import paramiko
-import base64
+import struct
 import traceback
 
+# pybase64 is preferred for its SIMD encoders but the standard library
+# is used when it is not installed
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
+
+SSH_ED25519 = b'ssh-ed25519'
+
+
+def _ssh_string(data: bytes):
+    return struct.pack('>I', len(data)) + data
+
 
 class Signer:
     """
@@ -20,35 +36,35 @@ class Signer:
         key_path = os.path.abspath(key_fn)
         self.key = None
         try:
-            self.key = paramiko.Ed25519Key.from_private_key_file(filename=key_path)
-        except Exception as ex:
-            print('FAILED to import private key file: {} {}'.format(key_path, traceback.format_exc(ex)))
-            os.exit(-1)
+            with open(key_path, 'rb') as key_file:
+                key = serialization.load_ssh_private_key(key_file.read(), password=None, backend=default_backend())
+            if not isinstance(key, ed25519.Ed25519PrivateKey):
+                raise ValueError('private key is not an ed25519 key')
+            self.key = key
+        except Exception:
+            print('FAILED to import private key file: {} {}'.format(key_path, traceback.format_exc()))
+            sys.exit(-1)
 
-    def _sign_str(self, payload: str):
+    def sign_bytes(self, payload: bytes):
         if self.key is None:
             print('signing key is missing')
-            os.exit(-1)
-        sig = self.key.sign_ssh_data(bytes(payload, 'utf-8'))
-        if isinstance(sig, paramiko.Message):
-            sig = sig.asbytes()
-        return base64.b64encode(sig).decode()
+            sys.exit(-1)
+        sig = self.key.sign(payload)
+        # Use the SSH wire format for the signature, as paramiko would, which is a pair of length
+        # prefixed strings with the key type followed by the raw signature
+        return base64.b64encode(_ssh_string(SSH_ED25519) + _ssh_string(sig)).decode()
 
     def sign(self, payload: str):
-        return self._sign_str(payload)
-
+        return self.sign_bytes(bytes(payload, 'utf-8'))
 
-def main():
-    if len(sys.argv) < 4:
-        print('USAGE {} private-key-file-path file-to-sign signature-file-path'.format(sys.argv[0]))
-        sys.exit(-1)
 
-    with open(sys.argv[3], 'w+') as f:
-        signer = Signer(sys.argv[1])
-        with open(sys.argv[2], 'r') as file:
+def sign_file(signer: Signer, input_fn: str, output_fn: str):
+    with open(output_fn, 'w+') as f:
+        # The file is signed as raw bytes avoiding decoding and then reencoding its contents
+        with open(input_fn, 'rb') as file:
             data = file.read()
         try:
-            result = signer.sign(data)
+            result = signer.sign_bytes(data)
         except Exception as ex:
             f.write('FAILED to sign data {}'.format(ex))
             sys.exit(-1)
@@ -56,5 +72,32 @@ def main():
         f.write(result)
 
 
+def main():
+    if len(sys.argv) < 4:
+        print('USAGE {} private-key-file-path file-to-sign signature-file-path'.format(sys.argv[0]))
+        print('      {} private-key-file-path --batch manifest-file-path'.format(sys.argv[0]))
+        print('      where each manifest line contains a file-to-sign and signature-file-path separated by a tab')
+        sys.exit(-1)
+
+    # The key is loaded once and used for every file being signed
+    signer = Signer(sys.argv[1])
+
+    if sys.argv[2] != '--batch':
+        sign_file(signer, sys.argv[2], sys.argv[3])
+        return
+
+    with open(sys.argv[3], 'r') as manifest:
+        for line_num, line in enumerate(manifest, start=1):
+            line = line.rstrip('\n')
+            if len(line) == 0:
+                continue
+            fields = line.split('\t')
+            if len(fields) != 2:
+                print('FAILED to parse manifest line {}, expected a file-to-sign and signature-file-path '
+                      'separated by a tab'.format(line_num))
+                sys.exit(-1)
+            sign_file(signer, fields[0], fields[1])
+
+
 if __name__ == '__main__':
     main()
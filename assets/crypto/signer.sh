@@ -11,7 +11,6 @@ which pip3
 which python3
 pip3 install pip==20.0.2 --user
 pip3 install --upgrade pip
-pip3 install pynacl==1.3.0
-pip3 install pycryptodome==3.9.7
-pip3 install paramiko==2.7.1
+pip3 install cryptography==3.3.2
+pip3 install pybase64==1.0.1
 python3 $EXP_DIR/signer.py $EXP_DIR/private $EXP_DIR/payload $EXP_DIR/signature
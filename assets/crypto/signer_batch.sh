@@ -0,0 +1,16 @@
+# Copyright 2020 (c) Cognizant Digital Business, Evolutionary AI. All rights reserved. Issued under the Apache 2.0 License.
+
+export PATH=$PATH:/root/.local/bin
+export EXP_DIR=`pwd`
+echo `pwd` >&2
+ls -alcrt
+eval "$(pyenv init -)"
+export PATH=$(pyenv root)/shims:$PATH
+eval "$(pyenv virtualenv-init -)"
+which pip3
+which python3
+pip3 install pip==20.0.2 --user
+pip3 install --upgrade pip
+pip3 install cryptography==3.3.2
+pip3 install pybase64==1.0.1
+python3 $EXP_DIR/signer.py $EXP_DIR/private --batch $EXP_DIR/manifest
@@ -2,20 +2,19 @@
 # Issued under the Apache 2.0 License.
 
 import os
-import os.path
 import sys
 
-import json
-
 
 def touch(fname, times=None):
     with open(fname, 'a'):
         os.utime(fname, times)
 
 
+# The JSON documents output are fixed and so are written as literals avoiding
+# the cost of importing and using the json module
+
 # During the first pass we will inject a number of directives for document editing
-data = {"experiment": {"name": "dummy pass"}}
-print(json.dumps(data))
+print('{"experiment": {"name": "dummy pass"}}')
 
 experiment = os.environ.get('RUN_ID')
 
@@ -30,21 +29,13 @@ test_first = f"/tmp/{experiment}-started"
 try:
     if not os.path.isfile(test_first):
         touch(test_first)
-        edit = [{"op": "replace", "path": "/experiment/name", "value": "First pass"}]
-        print(json.dumps(edit))
-        edit = [{"op": "remove", "path": "/experiment"}]
-        print(json.dumps(edit))
+        print('[{"op": "replace", "path": "/experiment/name", "value": "First pass"}]')
+        print('[{"op": "remove", "path": "/experiment"}]')
         sys.exit(-1)
 except:
     touch(test_first)
     sys.exit(-1)
 
-data = {
-    "experiment": {
-        "name": "Zaphod Beeblebrox",
-    }
-}
-
 # Output useful metadata
-print(json.dumps(data))
+print('{"experiment": {"name": "Zaphod Beeblebrox"}}')
 sys.stdout.flush()
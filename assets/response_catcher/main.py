@@ -13,23 +13,28 @@ python3 main.py --private-key=example-test-key --password=PassPhrase -q=test /
 """
 import argparse
 import os
+import signal
 import sys
-import pika
-import time
-import base64
 
-from Crypto.PublicKey import RSA
-from Crypto.Cipher import PKCS1_OAEP
-from Crypto.Hash import SHA256
 
-import nacl.secret
-import nacl.encoding
+def initialize(prvt_key, rmq_url, rmq_queue, output=sys.stdout.buffer):
 
-from google.protobuf import json_format
-import reports_pb2 as reports
+    # The messaging, crypto and protobuf modules are expensive to load and are only
+    # imported once the command line has been validated
+    import time
+    import pika
+    import pybase64
+    import orjson
 
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.asymmetric import padding
 
-def initialize(cipher, rmq_url, rmq_queue, output=sys.stdout):
+    import nacl.secret
+    import nacl.encoding
+    import nacl.exceptions
+
+    from google.protobuf import json_format
+    import reports_pb2 as reports
 
     # Connect to the rabbitMQ server
     connection = pika.BlockingConnection(pika.URLParameters(rmq_url))
@@ -38,52 +43,136 @@ def initialize(cipher, rmq_url, rmq_queue, output=sys.stdout):
     # Create a queue that we expect studioml will place encrypted response messages on
     channel.queue_declare(queue=rmq_queue)
 
-    # start the receiver
-    last_empty = time.time()
-    while True:
+    # The OAEP padding matches the SHA256 based scheme used by the runner when
+    # encrypting the symetric key and is the same for every message
+    oaep = padding.OAEP(mgf=padding.MGF1(algorithm=hashes.SHA256()), algorithm=hashes.SHA256(), label=None)
+
+    # Messages are pushed by the broker to this callback, the exit code is retained
+    # so that a failure can stop the consumer and be returned to the caller.  The number
+    # of unacknowledged messages the broker will push ahead of processing is limited
+    PREFETCH_COUNT = 64
+    exit_code = 0
+
+    # Bind the functions used for every message and receive loop pass once so that they
+    # are not repeatedly resolving module globals and their attributes
+    now = time.time
+    last_empty = now()
+    b64decode = pybase64.b64decode
+    decrypt = prvt_key.decrypt
+    SecretBox = nacl.secret.SecretBox
+    # CryptoError is the base of the nacl exceptions including its ValueError and TypeError
+    CryptoError = nacl.exceptions.CryptoError
+    Report = reports.Report
+    Parse = json_format.Parse
+    ParseError = json_format.ParseError
+    MessageToDict = json_format.MessageToDict
+    dumps = orjson.dumps
+    if output is not sys.stdout.buffer:
+        write = output.write
+    else:
+        # Reports written to stdout share it with status messages printed to the text stream,
+        # so pending text is flushed first to keep the lines in order.  When stdout is a
+        # terminal each report is also flushed so that it is visible as it arrives
+        flush_text = sys.stdout.flush
+        write_binary = output.write
+        flush_binary = output.flush if output.isatty() else None
+
+        def write(data):
+            flush_text()
+            write_binary(data)
+            if flush_binary is not None:
+                flush_binary()
+
+    APPEND_NEWLINE = orjson.OPT_APPEND_NEWLINE
+    NONCE_SIZE = nacl.secret.SecretBox.NONCE_SIZE
+    RAW_ENCODER = nacl.encoding.RawEncoder
+
+    def handle(body):
+        """
+        Decrypts and outputs a single report message, returning None on success or the exit
+        code that the catcher should stop with
+        """
+        # Split the message into two pieces the first is the Encrypted symetric key, encrypted using
+        # a private key from a public/private key pair.  The second being the encrypted gRPC message
+        # encrypted using the first symetric key.  The body is ASCII Base64 so it is split as bytes
+        # to avoid decoding the whole of the message as UTF-8
+        head, sep, tail = body.partition(b",")
+        if not sep:
+            print("message format error, separator missing")
+            return -1
+        # Message errors are handled here as pika reraises callback exceptions from
+        # process_data_events where they would be mistaken for broker errors
+        try:
+            symKeyBytes = b64decode(head, validate=False)
+            # msgBytes has a nonce in the first 24 bytes and then the message payload follows that
+            msgBytes = b64decode(tail, validate=False)
+        except ValueError as ex:
+            print(f"message decode error, {ex}")
+            return -1
+
+        try:
+            msgKey = decrypt(symKeyBytes, oaep)
+        except ValueError as ex:
+            print(f"crypto sym key error, {ex}")
+            return 0
+        except TypeError as ex:
+            print(f"crypto sym key error, {ex}")
+            return -1
+
+        try:
+            box = SecretBox(msgKey, RAW_ENCODER)
+            unencrypted = box.decrypt(msgBytes[NONCE_SIZE:], msgBytes[:NONCE_SIZE], RAW_ENCODER)
+        except CryptoError as ex:
+            print(f"message decrypt error, {ex}")
+            return -1
+
+        report = Report()
         try:
-            method_frame, header_frame, body = channel.basic_get(rmq_queue, auto_ack=True)
+            Parse(unencrypted, report)
+        except ParseError as ex:
+            print(f"message parse error, {ex}")
+            return -1
+        # Emit the report as a single line of JSON directly to the binary output stream
+        write(dumps(MessageToDict(report), option=APPEND_NEWLINE))
+        return None
+
+    def on_message(ch, method_frame, header_frame, body):
+        nonlocal last_empty, exit_code
+
+        last_empty = now()
+        result = handle(body)
+
+        # Messages are acknowledged once handled, including failures as these would otherwise
+        # be redelivered.  On stopping any messages prefetched but not yet dispatched are
+        # rejected by pika and requeued by the broker rather than being lost
+        ch.basic_ack(method_frame.delivery_tag)
+        if result is not None:
+            exit_code = result
+            ch.stop_consuming()
+
+    # start the receiver, the consumer is cancelled by the broker should the queue be deleted
+    # which will drop it from the channels list of consumers
+    channel.basic_qos(prefetch_count=PREFETCH_COUNT)
+    channel.basic_consume(queue=rmq_queue, on_message_callback=on_message, auto_ack=False)
+    while channel.consumer_tags:
+        try:
+            connection.process_data_events(time_limit=1.0)
         except pika.exceptions.ChannelClosedByBroker as ex:
             print(f"RMQ error, {ex}")
             return 0
         except ValueError as ex:
             print(f"RMQ file error, {ex}")
             return 0
-        if method_frame:
-            last_empty = time.time()
-            # Split the message into two pieces the first is the Encrypted symetric key, encrypted using
-            # a private key from a public/private key pair.  The second being the encrypted gRPC message
-            # encrypted using the first symetric key
-            parts = body.decode("utf-8").split(",")
-            symKeyBytes = base64.b64decode(parts[0])
-            # msgBytes has a nonce in the first 24 bytes and then the message payload follows that
-            msgBytes = base64.b64decode(parts[1])
-
-            try:
-                msgKey = cipher.decrypt(symKeyBytes)
-            except ValueError as ex:
-                print(f"crypto sym key error, {ex}")
-                return 0
-            except TypeError as ex:
-                print(f"crypto sym key error, {ex}")
-                return -1
 
-            box = nacl.secret.SecretBox(msgKey, nacl.encoding.RawEncoder)
-            unencrypted = box.decrypt(msgBytes[nacl.secret.SecretBox.NONCE_SIZE:], msgBytes[0:nacl.secret.SecretBox.NONCE_SIZE],
-                                      nacl.encoding.RawEncoder)
+        seconds_elapsed = now() - last_empty
 
-            report = reports.Report()
-            json_format.Parse(unencrypted, report)
-            print(' '.join(json_format.MessageToJson(report).splitlines()), file=output)
-        else:
-            seconds_elapsed = time.time() - last_empty
+        hours, rest = divmod(seconds_elapsed, 3600)
+        minutes, seconds = divmod(rest, 60)
+        if hours > 0 or minutes > 2:
+            last_empty = now()
+            print('Queue empty')
 
-            hours, rest = divmod(seconds_elapsed, 3600)
-            minutes, seconds = divmod(rest, 60)
-            if hours > 0 or minutes > 2:
-                last_empty = time.time()
-                print('Queue empty')
-            time.sleep(0.3)
+    return exit_code
 
 
 def main():
@@ -96,7 +185,7 @@ def main():
     required = parser.add_argument_group('required arguments')
     optional = parser.add_argument_group('optional arguments')
 
-    parser.add_argument("-V", "--version", help="show program version", action="store_true")
+    parser.add_argument("-V", "--version", help="show program version", action="version", version="0.0")
     required.add_argument("--private-key", "-k", help="the file name of the private key file for decrypting responses",
                           required=True)
     optional.add_argument("--password", "-p", help="the password that should be used with the private key file")
@@ -108,11 +197,6 @@ def main():
     # Read arguments from the command line
     args = parser.parse_args()
 
-    # Check for --version or -V
-    if args.version:
-        print("0.0")
-        return 0
-
     if not args.private_key:
         print(f"private key file option used for decryption not specified\n", file=sys.stderr)
         print(parser.print_help())
@@ -130,20 +214,39 @@ def main():
         print(f"--rmq-queue not specified", file=sys.stderr)
         return -1
 
-    output = sys.stdout
+    output = sys.stdout.buffer
     if args.output:
         if args.output != "-":
             try:
-                output = open(args.output, 'w')
+                # Reports are coalesced into large writes rather than a write per message
+                output = open(args.output, 'wb', buffering=1 << 20)
             except Exception as ex:
                 print(f"output file error, {ex}", file=sys.stderr)
                 return -1
 
-    prvt_key = RSA.importKey(open(args.private_key, 'rb').read(), args.password)
-    cipher = PKCS1_OAEP.new(prvt_key, SHA256)
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import serialization
+
+    password = None
+    if args.password:
+        password = args.password.encode('utf-8')
+
+    try:
+        with open(args.private_key, 'rb') as key_file:
+            prvt_key = serialization.load_pem_private_key(key_file.read(), password, default_backend())
+    except (ValueError, TypeError) as ex:
+        print(f"private key error, {ex}", file=sys.stderr)
+        return -1
+
+    # Convert a SIGTERM into an exit so that buffered reports are flushed, using the
+    # shell convention exit code so callers can still see that the catcher was killed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
 
     # Blocking function
-    return initialize(cipher, args.rmq_url, args.rmq_queue, output)
+    try:
+        return initialize(prvt_key, args.rmq_url, args.rmq_queue, output)
+    finally:
+        output.flush()
 
 
 if __name__ == "__main__":